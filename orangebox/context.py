@@ -14,7 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Dict, Optional, Tuple, Union
+from typing import Dict, List, Optional, Union
 
 from .defaults import HeaderDefaults
 from .types import FieldDefs, Frame, FrameType, Headers, Number
@@ -32,10 +32,10 @@ class Context:
         self.frame_count = 0  # count of parsed frames
         self.frame_type = None  # type: Optional[FrameType]
         self.field_index = 0  # index of current field
-        self.past_frames = (
+        self.past_frames = [
             Frame(FrameType.INTRA, b''),
             Frame(FrameType.INTRA, b''),
-            Frame(FrameType.INTRA, b''))  # type: Tuple[Frame, Frame, Frame]
+            Frame(FrameType.INTRA, b'')]  # type: List[Frame]
         self.last_gps_frame = Frame(FrameType.GPS, b'')
         self.last_gps_home_frame = Frame(FrameType.GPS_HOME, b'')
         self.current_frame = tuple()  # the current (possibly yet incomplete) frame
@@ -48,6 +48,11 @@ class Context:
                     self._names_to_indices[ftype][fdef.name] = i
         self.read_frame_count = 0  # count of all frames been read
         self.invalid_frame_count = 0  # count of invalid frames
+        # header values consumed by predictors on every matching field
+        self.minthrottle = headers.get("minthrottle", HeaderDefaults.minthrottle)  # type: int
+        self.vbatref = headers.get("vbatref", HeaderDefaults.vbatref)  # type: int
+        # index 0 is the minimum motor output
+        self.minmotor = headers.get("motorOutput", HeaderDefaults.motor_output)[0]  # type: int
         self.i_interval = self.headers.get("I interval", HeaderDefaults.i_interval)  # type: int
         self.skipped_frames = 0
         if self.i_interval < 1:
@@ -61,17 +66,29 @@ class Context:
             num, denom = p_interval.split('/')
             self.p_interval_num = int(num)
             self.p_interval_denom = int(denom)
+        if self.p_interval_denom < 1:
+            self.p_interval_denom = 1
+        # frame presence only depends on index % i_interval, so precompute one period
+        self._frame_presence_lut = [
+            (i + self.p_interval_num - 1) % self.p_interval_denom < self.p_interval_num
+            for i in range(self.i_interval)
+        ]
 
     def add_frame(self, frame: Frame):
-        if frame.type == FrameType.INTRA:
+        ftype = frame.type
+        past_frames = self.past_frames
+        if ftype == FrameType.INTRA:
             # override history with current INTRA frame
-            self.past_frames = (frame, frame, frame)
-        elif frame.type == FrameType.GPS:
+            past_frames[0] = past_frames[1] = past_frames[2] = frame
+        elif ftype == FrameType.GPS:
             self.last_gps_frame = frame
-        elif frame.type == FrameType.GPS_HOME:
+        elif ftype == FrameType.GPS_HOME:
             self.last_gps_home_frame = frame
         else:
-            self.past_frames = (frame, self.past_frames[0], self.past_frames[1])
+            # rotate the history ring in place instead of building a new tuple
+            past_frames[2] = past_frames[1]
+            past_frames[1] = past_frames[0]
+            past_frames[0] = frame
         self.frame_count += 1
 
     def get_past_value(self, age: int, default: Number = 0) -> Number:
@@ -80,6 +97,12 @@ class Context:
         except (KeyError, IndexError):
             return default
 
+    def get_field_index_by_name(self, frame_type: FrameType, field_name: str) -> Optional[int]:
+        try:
+            return self._names_to_indices[frame_type][field_name]
+        except KeyError:
+            return None
+
     def get_current_value_by_name(self,
                                   frame_type: FrameType,
                                   field_name: str,
@@ -90,8 +113,7 @@ class Context:
             return default
 
     def should_have_frame_at(self, index: int) -> bool:
-        return (index % self.i_interval + self.p_interval_num - 1) % \
-               self.p_interval_denom < self.p_interval_num
+        return self._frame_presence_lut[index % self.i_interval]
 
     def count_skipped_frames(self) -> int:
         if self.last_iter == -1:
@@ -14,7 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Dict, Iterator, Optional
+from typing import Dict, Optional
 
 from .context import Context
 from .tools import map_to, sign_extend_14bit, sign_extend_16bit, sign_extend_24bit, sign_extend_2bit, sign_extend_4bit, \
@@ -24,35 +24,67 @@ from .types import DecodedValue, Decoder
 decoder_map = dict()  # type: Dict[int, Decoder]
 
 
+# noinspection PyProtectedMember
 @map_to(0, decoder_map)
-def _signed_vb(data: Iterator[int], ctx: Optional[Context] = None) -> DecodedValue:
-    value = _unsigned_vb(data, ctx)
-    value = ((value % 0x100000000) >> 1) ^ -(value & 1)
-    return value
+def _signed_vb(data: "Reader", ctx: Optional[Context] = None) -> DecodedValue:
+    # inlined _unsigned_vb to save a call per field
+    buf = data._frame_data
+    pos = data._frame_data_ptr
+    byte = buf[pos]
+    if byte < 0x80:
+        # single byte fast path, the common case for deltas
+        data._frame_data_ptr = pos + 1
+        return (byte >> 1) ^ -(byte & 1)
+    shift, value = 0, 0
+    for _ in range(5):
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            # reached final byte
+            break
+        shift += 7
+    else:
+        # integer too long
+        value = 0
+    data._frame_data_ptr = pos
+    return ((value % 0x100000000) >> 1) ^ -(value & 1)
 
 
-# noinspection PyUnusedLocal
+# noinspection PyUnusedLocal,PyProtectedMember
 @map_to(1, decoder_map)
-def _unsigned_vb(data: Iterator[int], ctx: Optional[Context] = None) -> DecodedValue:
+def _unsigned_vb(data: "Reader", ctx: Optional[Context] = None) -> DecodedValue:
+    buf = data._frame_data
+    pos = data._frame_data_ptr
+    byte = buf[pos]
+    if byte < 0x80:
+        # single byte fast path, the common case for deltas
+        data._frame_data_ptr = pos + 1
+        return byte
     shift, result = 0, 0
-    for i in range(5):
-        byte = next(data)
-        result = result | ((byte & ~0x80) << shift)
-        if byte < 128:
+    for _ in range(5):
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
             # reached final byte
-            return result
+            break
         shift += 7
-    # integer too long
-    return 0
+    else:
+        # integer too long
+        result = 0
+    data._frame_data_ptr = pos
+    return result
 
 
 @map_to(3, decoder_map)
-def _neg_14bit(data: Iterator[int], ctx: Optional[Context] = None) -> DecodedValue:
+def _neg_14bit(data: "Reader", ctx: Optional[Context] = None) -> DecodedValue:
     return -sign_extend_14bit(_unsigned_vb(data, ctx))
 
 
+# noinspection PyProtectedMember
 @map_to(6, decoder_map)
-def _tag8_8svb(data: Iterator[int], ctx: Optional[Context] = None) -> DecodedValue:
+def _tag8_8svb(data: "Reader", ctx: Optional[Context] = None) -> DecodedValue:
     # count adjacent fields with same encoding
     group_count = 8
     fdeflen = ctx.field_def_counts[ctx.frame_type]
@@ -64,65 +96,66 @@ def _tag8_8svb(data: Iterator[int], ctx: Optional[Context] = None) -> DecodedVal
             group_count = i - ctx.field_index
             break
     if group_count == 1:
-        # single field
-        return _signed_vb(data, ctx)
+        # single field (1-tuple keeps the group decoder ABI uniform)
+        return _signed_vb(data, ctx),
     else:
         # multiple fields
-        header = next(data)
-        values = ()
+        header = data._frame_data[data._frame_data_ptr]
+        data._frame_data_ptr += 1
+        values = []
         for _ in range(group_count):
-            values += (_signed_vb(data, ctx) if header & 0x01 else 0,)
+            values.append(_signed_vb(data, ctx) if header & 0x01 else 0)
             header >>= 1
-        return values
+        return tuple(values)
 
 
-# noinspection PyUnusedLocal
+# noinspection PyUnusedLocal,PyProtectedMember
 @map_to(7, decoder_map)
-def _tag2_3s32(data: Iterator[int], ctx: Optional[Context] = None) -> DecodedValue:
-    lead = next(data)
+def _tag2_3s32(data: "Reader", ctx: Optional[Context] = None) -> DecodedValue:
+    buf = data._frame_data
+    pos = data._frame_data_ptr
+    lead = buf[pos]
+    pos += 1
     shifted = lead >> 6
     if shifted == 0:  # 2bit fields
+        data._frame_data_ptr = pos
         v1 = sign_extend_2bit((lead >> 4) & 0x03)
         v2 = sign_extend_2bit((lead >> 2) & 0x03)
         v3 = sign_extend_2bit(lead & 0x03)
         return v1, v2, v3
     elif shifted == 1:  # 4bit fields
         v1 = sign_extend_4bit(lead & 0x0F)
-        lead = next(data)
+        lead = buf[pos]
+        pos += 1
+        data._frame_data_ptr = pos
         v2 = sign_extend_4bit(lead >> 4)
         v3 = sign_extend_4bit(lead & 0x0F)
         return v1, v2, v3
     elif shifted == 2:  # 6bit fields
         v1 = sign_extend_6bit(lead & 0x3F)
-        lead = next(data)
-        v2 = sign_extend_6bit(lead & 0x3F)
-        lead = next(data)
-        v3 = sign_extend_6bit(lead & 0x3F)
+        v2 = sign_extend_6bit(buf[pos] & 0x3F)
+        v3 = sign_extend_6bit(buf[pos + 1] & 0x3F)
+        data._frame_data_ptr = pos + 2
         return v1, v2, v3
     elif shifted == 3:  # fields are 8, 16 or 24bit
-        values = ()
+        values = []
         for _ in range(3):
             field_type = lead & 0x03
             if field_type == 0:  # 8bit
-                v1 = next(data)
-                values += (sign_extend_8bit(v1),)
+                values.append(sign_extend_8bit(buf[pos]))
+                pos += 1
             elif field_type == 1:  # 16bit
-                v1 = next(data)
-                v2 = next(data)
-                values += (sign_extend_16bit(v1 | (v2 << 8)),)
+                values.append(sign_extend_16bit(buf[pos] | (buf[pos + 1] << 8)))
+                pos += 2
             elif field_type == 2:  # 24bit
-                v1 = next(data)
-                v2 = next(data)
-                v3 = next(data)
-                values += (sign_extend_24bit(v1 | (v2 << 8) | (v3 << 16)),)
+                values.append(sign_extend_24bit(buf[pos] | (buf[pos + 1] << 8) | (buf[pos + 2] << 16)))
+                pos += 3
             elif field_type == 3:  # 32bit
-                v1 = next(data)
-                v2 = next(data)
-                v3 = next(data)
-                v4 = next(data)
-                values += (v1 | (v2 << 8) | (v3 << 16) | (v4 << 24),)
+                values.append(buf[pos] | (buf[pos + 1] << 8) | (buf[pos + 2] << 16) | (buf[pos + 3] << 24))
+                pos += 4
             lead >>= 2
-        return values
+        data._frame_data_ptr = pos
+        return tuple(values)
     return 0, 0, 0
 
 
@@ -134,58 +167,80 @@ def _tag8_4s16_versioned(data_version: int) -> Decoder:
         return _tag8_4s16_v2
 
 
-def _tag8_4s16_v1(_: Iterator[int], __: Optional[Context] = None) -> DecodedValue:
+# mark decoders that must be resolved against the log's data version before
+# use; the reader checks this marker instead of inspecting function names
+_tag8_4s16_versioned.versioned = True
+
+
+def _tag8_4s16_v1(_: "Reader", __: Optional[Context] = None) -> DecodedValue:
     # TODO
-    return "TODO:tag8_4s16_v1"
+    return "TODO:tag8_4s16_v1",
 
 
-# noinspection PyUnusedLocal
-def _tag8_4s16_v2(data: Iterator[int], ctx: Optional[Context] = None) -> DecodedValue:
-    selector = next(data)
-    values = ()
+# noinspection PyUnusedLocal,PyProtectedMember
+def _tag8_4s16_v2(data: "Reader", ctx: Optional[Context] = None) -> DecodedValue:
+    buf = data._frame_data
+    pos = data._frame_data_ptr
+    selector = buf[pos]
+    pos += 1
+    values = []
     nibble_index = 0
     buffer = 0
     for _ in range(4):
         field_type = selector & 0x03
         if field_type == 0:  # field zero
-            values += (0,)
+            values.append(0)
         elif field_type == 1:  # field 4bit
             if nibble_index == 0:
-                buffer = next(data)
-                values += (sign_extend_4bit(buffer >> 4),)
+                buffer = buf[pos]
+                pos += 1
+                values.append(sign_extend_4bit(buffer >> 4))
                 nibble_index = 1
             else:
-                values += (sign_extend_4bit(buffer & 0x0F),)
+                values.append(sign_extend_4bit(buffer & 0x0F))
                 nibble_index = 0
         elif field_type == 2:  # field 8bit
             if nibble_index == 0:
-                values += (sign_extend_8bit(next(data)),)
+                values.append(sign_extend_8bit(buf[pos]))
+                pos += 1
             else:
                 v1 = (buffer & 0x0F) << 4
-                buffer = next(data)
+                buffer = buf[pos]
+                pos += 1
                 v1 |= buffer >> 4
-                values += (sign_extend_8bit(v1),)
+                values.append(sign_extend_8bit(v1))
         elif field_type == 3:  # field 16bit
             if nibble_index == 0:
-                v1 = next(data)
-                v2 = next(data)
-                values += (sign_extend_16bit((v1 << 8) | v2),)
+                v1 = buf[pos]
+                v2 = buf[pos + 1]
+                pos += 2
+                values.append(sign_extend_16bit((v1 << 8) | v2))
             else:
-                v1 = next(data)
-                v2 = next(data)
-                values += (sign_extend_16bit(((buffer & 0x0F) << 12) | (v1 << 4) | (v2 >> 4)),)
+                v1 = buf[pos]
+                v2 = buf[pos + 1]
+                pos += 2
+                values.append(sign_extend_16bit(((buffer & 0x0F) << 12) | (v1 << 4) | (v2 >> 4)))
                 buffer = v2
         selector >>= 2
-    return values
+    data._frame_data_ptr = pos
+    return tuple(values)
 
 
 # noinspection PyUnusedLocal
 @map_to(9, decoder_map)
-def _null(data: Iterator[int], ctx: Optional[Context] = None) -> DecodedValue:
+def _null(data: "Reader", ctx: Optional[Context] = None) -> DecodedValue:
     return 0
 
 
 @map_to(10, decoder_map)
-def _tag2_3svariable(_: Iterator[int], __: Optional[Context] = None) -> DecodedValue:
+def _tag2_3svariable(_: "Reader", __: Optional[Context] = None) -> DecodedValue:
     # TODO
-    return "TODO:tag2_3svariable"
+    return "TODO:tag2_3svariable",
+
+
+# group decoders always return a tuple of values covering several adjacent
+# fields; the parser checks this marker once when building its decode plans
+# instead of testing isinstance() on every decoded value
+for _group_decoder in (_tag8_8svb, _tag2_3s32, _tag8_4s16_v1, _tag8_4s16_v2, _tag2_3svariable):
+    _group_decoder.returns_group = True
+del _group_decoder
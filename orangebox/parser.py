@@ -15,16 +15,24 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
-from typing import Iterator, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from .context import Context
 from .events import event_map
 from .reader import Reader
-from .types import Event, EventParser, EventType, FieldDef, Frame, FrameType, Headers
+from .types import Decoder, Event, EventParser, EventType, Frame, FrameType, Headers, Predictor
 
 MAX_TIME_JUMP = 10 * 1000000
 MAX_ITER_JUMP = 500 * 10
 
+# frame marker byte -> frame type (None for non-markers), to avoid
+# FrameType(chr(byte)) plus a ValueError for every non-marker byte in the
+# hot loop; a flat 256-entry list is cheaper to index than a dict
+_frame_type_lut = [None] * 256  # type: List[Optional[FrameType]]
+for _t in FrameType:
+    _frame_type_lut[ord(_t.value)] = _t
+del _t
+
 _log = logging.getLogger(__name__)
 
 
@@ -43,6 +51,7 @@ class Parser:
         self._field_names = []  # type: List[str]
         self._end_of_log = False
         self._ctx = None  # type: Optional[Context]
+        self._decode_plans = {}  # type: Dict[FrameType, List[Tuple[Decoder, Predictor, bool]]]
         self.set_log_index(reader.log_index)
 
     def set_log_index(self, index: int):
@@ -61,14 +70,26 @@ class Parser:
         reader.set_log_index(index)
         self._headers = {k: v for k, v in reader.headers.items() if "Field" not in k}
         self._ctx = Context(self._headers, reader.field_defs)
+        # specialize decoding for the selected log: resolve each field's decoder
+        # and predictor once so the frame loop doesn't touch FieldDef at all;
+        # the third element tells whether the decoder emits a group of values
+        self._decode_plans = {
+            ftype: [(fdef.decoderfun, fdef.predictorfun, getattr(fdef.decoderfun, "returns_group", False))
+                    for fdef in fdefs]
+            for ftype, fdefs in reader.field_defs.items()
+        }
         self._field_names = []
+        seen_names = set()
         for ftype in [FrameType.INTRA, FrameType.SLOW, FrameType.GPS]:
             # Note: retaining the order above is important for communality with bb-log-viewer
             # Note 2: GPS_home is not written out by the blackbox-log-viewer (but added as offset to GPS_coord)
             # Note 3: GPS mysteriously contains a "time" field. This is correctly skipped by the filter below
             if ftype in reader.field_defs:
-                self._field_names += filter(lambda x: x is not None and x not in self._field_names,
-                                            map(lambda x: x.name, reader.field_defs[ftype]))
+                for fdef in reader.field_defs[ftype]:
+                    name = fdef.name
+                    if name is not None and name not in seen_names:
+                        seen_names.add(name)
+                        self._field_names.append(name)
 
     @staticmethod
     def load(path: str,
@@ -89,27 +110,62 @@ class Parser:
         :rtype: Iterator[Frame]
         """
         field_defs = self._reader.field_defs
-        last_slow = None  # type: Optional[Frame]
-        last_gps = None  # type: Optional[Frame]
+        decode_plans = self._decode_plans
         ctx = self._ctx  # type: Context
         reader = self._reader
         last_time = None
         last_iter = 0
         last_frame_pos = 0
         last_frame_is_corrupt = False
-        for byte in reader:
-            try:
-                ftype = FrameType(chr(byte))
-            except ValueError:
+        frame_type_lut = _frame_type_lut
+        # snapshot once: the .format() arguments below are only worth building
+        # when debug logging is actually on
+        log_debug = _log.isEnabledFor(logging.DEBUG)
+        # INTER shares its field names with INTRA, so one lookup covers both
+        time_index = ctx.get_field_index_by_name(FrameType.INTRA, "time")
+        iter_index = ctx.get_field_index_by_name(FrameType.INTRA, "loopIteration")
+        # tails of SLOW/GPS data appended to every main frame; rebuilt only when
+        # a new SLOW/GPS frame arrives instead of per main frame (the empty
+        # string placeholders ensure the right amount of ',' are written out
+        # at least; GPS skips its "time" field the way blackbox-log-viewer does)
+        has_extra = False
+        slow_tail = ()
+        gps_tail = ()
+        if FrameType.SLOW in field_defs:
+            has_extra = True
+            slow_tail = ("",) * len(field_defs[FrameType.SLOW])
+        if FrameType.GPS in field_defs:
+            has_extra = True
+            gps_tail = ("",) * (len(field_defs[FrameType.GPS]) - 1)
+        # scan the frame data through locals instead of the reader's iterator
+        # protocol; decoders advance the shared pointer, so it is re-read at
+        # the top of every iteration
+        # noinspection PyProtectedMember
+        frame_data = reader._frame_data
+        data_len = len(reader)
+        while True:
+            pos = reader._frame_data_ptr
+            if pos >= data_len:
+                # end of frame data
+                break
+            byte = frame_data[pos]
+            reader._frame_data_ptr = pos + 1
+            ftype = frame_type_lut[byte]
+            if ftype is None:
                 if not last_frame_is_corrupt:
-                    reader.seek(last_frame_pos + 1)
+                    pos = last_frame_pos + 1
                     ctx.invalid_frame_count += 1
                 last_frame_is_corrupt = True
+                # resync by scanning ahead for the next marker byte instead of
+                # taking another trip through the loop for every corrupt byte
+                while pos < data_len and frame_type_lut[frame_data[pos]] is None:
+                    pos += 1
+                reader._frame_data_ptr = pos
                 continue
 
             ctx.frame_type = ftype
             last_frame_is_corrupt = False
-            last_frame_pos = reader.tell() - 1
+            last_frame_pos = pos
 
             if ftype == FrameType.EVENT:
                 # parse event frame (event frames do not depend on field defs)
@@ -130,15 +186,15 @@ class Parser:
                 continue
 
             # decode INTRA, INTER, SLOW, GPS or GPS_HOME frame
-            frame = self._parse_frame(field_defs[ftype], reader)
+            frame = self._parse_frame(decode_plans[ftype], reader)
 
             # store these frames to append them to subsequent frames:
             if ftype == FrameType.SLOW:
-                last_slow = frame
+                slow_tail = frame.data
                 ctx.read_frame_count += 1
                 continue
             elif ftype == FrameType.GPS:
-                last_gps = frame
+                gps_tail = frame.data[1:]  # skip time
                 ctx.read_frame_count += 1
                 continue
             elif ftype == FrameType.GPS_HOME:
@@ -147,18 +203,22 @@ class Parser:
                 continue
 
             # validate frame
-            current_time = ctx.get_current_value_by_name(ftype, "time")
+            current_time = frame.data[time_index] if time_index is not None else 0
             if last_time is not None and last_time >= current_time and MAX_TIME_JUMP < current_time - last_time:
-                _log.debug("Invalid {:s} Frame #{:d} due to time desync".format(ftype.value, ctx.read_frame_count + 1))
+                if log_debug:
+                    _log.debug(
+                        "Invalid {:s} Frame #{:d} due to time desync".format(ftype.value, ctx.read_frame_count + 1))
                 last_time = current_time
                 ctx.read_frame_count += 1
                 ctx.invalid_frame_count += 1
                 continue
             last_time = current_time
-            current_iter = ctx.get_current_value_by_name(ftype, "loopIteration")
+            current_iter = frame.data[iter_index] if iter_index is not None else 0
             ctx.last_iter = current_iter
             if last_iter >= current_iter and MAX_ITER_JUMP < current_iter + last_iter:
-                _log.debug("Skipping {:s} Frame #{:d} due to iter desync".format(ftype.value, ctx.read_frame_count + 1))
+                if log_debug:
+                    _log.debug(
+                        "Skipping {:s} Frame #{:d} due to iter desync".format(ftype.value, ctx.read_frame_count + 1))
                 last_iter = current_iter
                 ctx.read_frame_count += 1
                 ctx.invalid_frame_count += 1
@@ -166,60 +226,44 @@ class Parser:
             last_iter = current_iter
 
             # add in extra frames (GPS, GPS_HOME and SLOW)
-            extra_data = []
-
-            # add slow frames (list of empty strings if not available to ensure
-            # the right amount of ',' are written out at least)
-            if FrameType.SLOW in field_defs:
-                if last_slow:
-                    extra_data += last_slow.data
-                else:
-                    extra_data += [""] * len(field_defs[FrameType.SLOW])
-
-            # add GPS frames the way blackbox-log-viewer seems to do it
-            if FrameType.GPS in field_defs:
-                if last_gps:
-                    extra_data += list(last_gps.data[1:])  # skip time
-                else:
-                    extra_data += [""] * (len(field_defs[FrameType.GPS]) - 1)
-
-            frame = Frame(ftype, frame.data + tuple(extra_data))
-
-            try:
-                FrameType(chr(reader.value()))
-            except ValueError:
-                _log.debug("Dropping {:s} Frame #{:d} because it's corrupt"
-                           .format(ftype.value, ctx.read_frame_count + 1))
+            if has_extra:
+                frame = Frame(ftype, frame.data + slow_tail + gps_tail)
+
+            if frame_type_lut[reader.value()] is None:
+                if log_debug:
+                    _log.debug("Dropping {:s} Frame #{:d} because it's corrupt"
+                               .format(ftype.value, ctx.read_frame_count + 1))
                 ctx.invalid_frame_count += 1
                 continue
             ctx.read_frame_count += 1
             ctx.add_frame(frame)
             yield frame
 
-    def _parse_frame(self, fdefs: List[FieldDef], reader: Reader) -> Frame:
-        result = ()
+    def _parse_frame(self, plan: List[Tuple[Decoder, Predictor, bool]], reader: Reader) -> Frame:
+        result = []
+        append = result.append
         ctx = self._ctx
-        ctx.field_index = 0
-        field_count = ctx.field_def_counts[ctx.frame_type]
-        while ctx.field_index < field_count:
-            # make current frame available in context
-            ctx.current_frame = result
-            fdef = fdefs[ctx.field_index]
+        frame_type = ctx.frame_type
+        field_count = len(plan)
+        field_index = 0
+        # make current frame available in context (result is appended in place)
+        ctx.current_frame = result
+        while field_index < field_count:
+            ctx.field_index = field_index
+            decoderfun, predictorfun, returns_group = plan[field_index]
             # decode current field value
-            rawvalue = fdef.decoderfun(reader, ctx)
+            rawvalue = decoderfun(reader, ctx)
             # apply predictions
-            if isinstance(rawvalue, tuple):
-                value = ()
+            if returns_group:
                 for v in rawvalue:
-                    fdef = fdefs[ctx.field_index]
-                    value += (fdef.predictorfun(v, ctx),)
-                    ctx.field_index += 1
-                result += value
+                    ctx.field_index = field_index
+                    append(plan[field_index][1](v, ctx))
+                    field_index += 1
             else:
-                value = fdef.predictorfun(rawvalue, ctx)
-                ctx.field_index += 1
-                result += (value,)
-        return Frame(ctx.frame_type, result)
+                append(predictorfun(rawvalue, ctx))
+                field_index += 1
+        ctx.field_index = field_index
+        return Frame(frame_type, tuple(result))
 
     def _parse_event_frame(self, reader: Reader) -> bool:
         byte = next(reader)
@@ -15,13 +15,15 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
+import mmap
+from types import MappingProxyType
 from typing import BinaryIO, Dict, Iterator, List, Optional
 
 from .decoders import decoder_map
 from .defaults import HeaderDefaults
 from .errors import InvalidHeaderException
 from .predictors import predictor_map
-from .tools import _is_ascii, _trycast
+from .tools import _trycast
 from .types import FieldDef, FrameType, Headers
 
 MAX_FRAME_SIZE = 256
@@ -54,12 +56,16 @@ class Reader:
         self._frame_data = b''
         self._frame_data_len = 0
         self._allow_invalid_header = allow_invalid_header
+        self._mmap = None  # type: Optional[mmap.mmap]
         with open(path, "rb") as f:
             if not f.seekable():
                 msg = "Input file must be seekable"
                 _log.critical(msg)
                 raise IOError(msg)
-            self._find_pointers(f)
+            # map the whole file instead of copying it into memory; the map stays
+            # valid after the file object is closed
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._find_pointers(self._mmap)
         if log_index is not None:
             self.set_log_index(log_index)
 
@@ -75,12 +81,20 @@ class Reader:
         if index < 1 or self.log_count < index:
             raise RuntimeError("Invalid log_index: {:d} (1 <= x < {:d})".format(index, self.log_count))
         start = self._log_pointers[index - 1]
-        with open(self._path, "rb") as f:
-            f.seek(start)
-            self._update_headers(f)
-            f.seek(start + self._header_size)
-            size = self._log_pointers[index] - start - self._header_size if index < self.log_count else None
-            self._frame_data = f.read(size) if size is not None else f.read()
+        mm = self._mmap
+        mm.seek(start)
+        self._update_headers(mm)
+        end = self._log_pointers[index] if index < self.log_count else len(mm)
+        data_start = start + self._header_size
+        if hasattr(mm, "madvise"):
+            # let the kernel prefetch the selected slice ahead of the parser
+            # (madvise needs a page-aligned offset; not available on all
+            # platforms or before Python 3.8)
+            page_start = data_start - data_start % mmap.PAGESIZE
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+            mm.madvise(mmap.MADV_WILLNEED, page_start, end - page_start)
+        # a memoryview slice of the map avoids copying the frame data
+        self._frame_data = memoryview(mm)[data_start:end]
         self._log_index = index
         self._frame_data_ptr = 0
         self._frame_data_len = len(self._frame_data)
@@ -103,25 +117,23 @@ class Reader:
     def _read_header_line(self, f: BinaryIO) -> Optional[bytes]:
         """Read the next header line up to a linefeed or invalid character.
         """
-        result = bytes()
-        while True:
-            byte = f.read(1)
-            if not byte:
-                return result
-            elif byte == b'I' and len(result) == 0:
-                f.seek(-1, 1)
-                return None
-            elif byte == b'\n':
-                return result + b'\n'
-            elif not _is_ascii(byte) and result.startswith(b'H'):
-                if self._allow_invalid_header:
-                    _log.warning(f"Invalid byte in header: {byte} (read: {result})")
-                    invalid_part = len(result) - result.find(b'I') + 1
-                    f.seek(-invalid_part, 1)
-                    return None
-                else:
-                    raise InvalidHeaderException(result, f.tell())
-            result += byte
+        start = f.tell()
+        line = f.readline()
+        if line.startswith(b'I'):
+            # start of frame data
+            f.seek(start)
+            return None
+        if line.startswith(b'H'):
+            for i, byte in enumerate(line):
+                if 127 < byte:
+                    # invalid (non-ASCII) byte in a header line
+                    if self._allow_invalid_header:
+                        _log.warning(f"Invalid byte in header: {bytes([byte])} (read: {line[:i]})")
+                        f.seek(start + line.find(b'I', 0, i))
+                        return None
+                    else:
+                        raise InvalidHeaderException(line[:i], start + i + 1)
+        return line
 
     def _parse_header_line(self, data: Optional[bytes]) -> bool:
         """Parse a header line and return `False` if it's invalid.
@@ -129,26 +141,29 @@ class Reader:
         if not data or data[0] != 72:  # 72 == ord('H')
             # not a header line
             return False
-        line = data.decode().replace("H ", "", 1)
-        try:
-            name, value = line.split(':', 1)
-        except ValueError:
-            _log.warning(f"Header line has invalid format: '{line}'")
+        # stay in bytes until the split so long field definition lists aren't
+        # decoded wholesale; only the short name and tokens become strings
+        line = data.replace(b'H ', b'', 1)
+        name, sep, value = line.partition(b':')
+        if not sep:
+            _log.warning(f"Header line has invalid format: '{line.decode(errors='replace')}'")
             return False
-        self._headers[name.strip()] = [_trycast(s.strip()) for s in value.split(',')] if ',' in value \
-            else _trycast(value.strip())
+        self._headers[name.strip().decode()] = [_trycast(s.strip().decode()) for s in value.split(b',')] \
+            if b',' in value else _trycast(value.strip().decode())
         return True
 
-    def _find_pointers(self, f: BinaryIO):
-        start = f.tell()
-        first_line = f.readline()
-        f.seek(start)
-        content = f.read()
-        new_index = content.find(first_line)
+    def _find_pointers(self, mm: mmap.mmap):
+        start = mm.tell()
+        first_line = mm.readline()
+        mm.seek(start)
+        # mmap.find searches the mapped pages in place, no full-file copy
+        new_index = mm.find(first_line)
         step = len(first_line)
         while -1 < new_index:
             self._log_pointers.append(new_index)
-            new_index = content.find(first_line, new_index + step + 1)
+            # the next log can begin directly after this line, so resume the
+            # search right at the end of the match
+            new_index = mm.find(first_line, new_index + step)
 
     def _build_field_defs(self):
         """Use the read headers to populate the `field_defs` property.
@@ -157,20 +172,35 @@ class Reader:
         field_defs = self._field_defs
         predictors = predictor_map
         decoders = decoder_map
+        # field header format: 'Field <FrameType> <Property>'; parse each key
+        # once and bucket by frame type instead of rescanning every header for
+        # every frame type
+        field_headers = {}  # type: Dict[FrameType, List[tuple]]
+        for header_key, header_value in headers.items():
+            if not header_key.startswith("Field "):
+                # skip headers unrelated to defining fields
+                continue
+            parts = header_key.split(" ", 2)
+            if len(parts) != 3:
+                continue
+            try:
+                frame_type = FrameType(parts[1])
+            except ValueError:
+                continue
+            field_headers.setdefault(frame_type, []).append((parts[2], header_value))
         for frame_type in FrameType:
-            # field header format: 'Field <FrameType> <Property>'
-            for header_key, header_value in headers.items():
-                if "Field " + frame_type.value not in header_key:
-                    # skip headers unrelated to defining fields
-                    continue
+            for prop, header_value in field_headers.get(frame_type, ()):
                 if frame_type not in field_defs:
                     field_defs[frame_type] = [FieldDef(frame_type) for _ in range(len(header_value))]
-                prop = header_key.split(" ", 2)[-1]
                 for i, framedef_value in enumerate(header_value):
-                    fdef_name = field_defs[frame_type][i].name
-                    if fdef_name == "GPS_coord[1]" and framedef_value == 7:
+                    fdef = field_defs[frame_type][i]
+                    if fdef.name == "GPS_coord[1]" and framedef_value == 7:
                         framedef_value = 256  # catch latitude
-                    field_defs[frame_type][i].__dict__[prop] = framedef_value
+                    try:
+                        setattr(fdef, prop, framedef_value)
+                    except AttributeError:
+                        # a field property FieldDef doesn't know about
+                        pass
                     if prop == "predictor":
                         if framedef_value not in predictors:
                             raise RuntimeError("No predictor found for {:d}".format(framedef_value))
@@ -181,7 +211,7 @@ class Reader:
                             raise RuntimeError("No decoder found for {:d}".format(framedef_value))
                         else:
                             decoder = decoders[framedef_value]
-                            if decoder.__name__.endswith("_versioned"):
+                            if getattr(decoder, "versioned", False):
                                 # short circuit calls to versioned decoders
                                 # noinspection PyArgumentList
                                 decoder = decoder(headers.get("Data version", HeaderDefaults.data_version))
@@ -219,19 +249,28 @@ class Reader:
 
     @property
     def headers(self) -> Headers:
-        """Dict of parsed headers.
+        """Read-only view of the parsed headers.
 
         :type: dict
         """
-        return dict(self._headers)
+        return MappingProxyType(self._headers)
 
     @property
     def field_defs(self) -> Dict[FrameType, List[FieldDef]]:
-        """Dict of built field definitions.
+        """Read-only view of the built field definitions.
 
         :type: dict
         """
-        return dict(self._field_defs)
+        return MappingProxyType(self._field_defs)
+
+    def close(self):
+        """Release the memory-mapped log file. The `Reader` must not be used afterwards.
+        """
+        self._frame_data = b''
+        self._frame_data_len = 0
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
 
     def value(self) -> int:
         """Get current byte value.
@@ -257,10 +296,11 @@ class Reader:
         return self
 
     def __next__(self) -> Optional[int]:
-        if self._frame_data_len == self._frame_data_ptr:
+        ptr = self._frame_data_ptr
+        if self._frame_data_len == ptr:
             return None
-        byte = self._frame_data[self._frame_data_ptr]
-        self._frame_data_ptr += 1
+        byte = self._frame_data[ptr]
+        self._frame_data_ptr = ptr + 1
         return byte
 
     def __len__(self) -> int:
@@ -14,7 +14,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from struct import pack, unpack
+import re
+from functools import lru_cache
 from typing import Any, Callable, Union
 
 from .types import Number
@@ -28,58 +29,56 @@ def map_to(key: Any, amap: dict) -> Callable:
     return decorator
 
 
-def toint32(word):
-    return unpack('i', pack('I', word))[0]
+def _make_sign_extend(bits: int) -> Callable[[int], int]:
+    """Build a sign extension helper for the given width.
 
+    The helpers use the branchless (x ^ sign) - sign identity: XOR-ing with
+    the sign bit clears it (or sets it when absent) and the subtraction
+    restores the value with the correct sign. The sign bit is bound as a
+    default argument so each call loads it as a local.
+    """
 
-def sign_extend_24bit(bits):
-    return toint32(bits | 0xFF000000) if bits & 0x800000 else bits
-
-
-def sign_extend_16bit(word):
-    return toint32(word | 0xFFFF0000) if word & 0x8000 else word
-
-
-def sign_extend_14bit(word):
-    return toint32(word | 0xFFFFC000) if word & 0x2000 else word
-
-
-def sign_extend_8bit(byte):
-    return toint32(byte | 0xFFFFFF00) if byte & 0x80 else byte
-
-
-def sign_extend_7bit(byte):
-    return toint32(byte | 0xFFFFFF80) if byte & 0x40 else byte
-
-
-def sign_extend_6bit(byte):
-    return toint32(byte | 0xFFFFFFC0) if byte & 0x20 else byte
-
+    def sign_extend(value: int, _sign=1 << (bits - 1)) -> int:
+        return (value ^ _sign) - _sign
 
-def sign_extend_5bit(byte):
-    return toint32(byte | 0xFFFFFFE0) if byte & 0x10 else byte
+    sign_extend.__name__ = "sign_extend_{:d}bit".format(bits)
+    return sign_extend
 
 
-def sign_extend_4bit(nibble):
-    return toint32(nibble | 0xFFFFFFF0) if nibble & 0x08 else nibble
+sign_extend_24bit = _make_sign_extend(24)
+sign_extend_16bit = _make_sign_extend(16)
+sign_extend_14bit = _make_sign_extend(14)
+sign_extend_8bit = _make_sign_extend(8)
+sign_extend_7bit = _make_sign_extend(7)
+sign_extend_6bit = _make_sign_extend(6)
+sign_extend_5bit = _make_sign_extend(5)
+sign_extend_4bit = _make_sign_extend(4)
+sign_extend_2bit = _make_sign_extend(2)
 
 
-def sign_extend_2bit(byte) -> int:
-    return toint32(byte | 0xFFFFFFFC) if byte & 0x02 else byte
+# classify the common shapes up front so non-numeric strings don't pay for
+# raised-and-caught ValueErrors
+_int_re = re.compile(r"[-+]?\d+$")
+_float_re = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?$")
 
 
+# header values repeat heavily (predictor/encoding/signedness IDs across
+# hundreds of fields), so memoize to skip the conversions altogether
+@lru_cache(maxsize=4096)
 def _trycast(s: str) -> Union[Number, str]:
     """Try to cast a string to the most appropriate numeric type.
     """
     if s.startswith("0x"):
         return int(s, 16)
-    try:
+    if _int_re.match(s):
         return int(s)
+    if _float_re.match(s):
+        return float(s)
+    try:
+        # fallback for float spellings the pattern doesn't cover (inf, nan)
+        return float(s)
     except ValueError:
-        try:
-            return float(s)
-        except ValueError:
-            return s
+        return s
 
 
 def _is_ascii(s: bytes) -> bool:
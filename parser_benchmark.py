@@ -4,11 +4,21 @@ import timeit
 
 from orangebox import Parser
 
-number_of_runs = 1
+number_of_runs = 5
+
+parser = None
 
 
 def main():
-    parser = Parser.load(sys.argv[1])
+    # load lazily so importers (parser_profile.py) can call main() on its own;
+    # warm calls rewind and reset the parser state so only frame decoding is
+    # measured, not the one-time file mapping and header parsing
+    global parser
+    if parser is None:
+        parser = Parser.load(sys.argv[1])
+    reader = parser.reader
+    reader.seek(0)
+    parser.set_log_index(reader.log_index)
     list(parser.frames())
 
 
@@ -16,4 +26,5 @@ if __name__ == "__main__":
     # disable logging, but it doesn't seem to be a big performance hit anyway
     logging.disable(logging.CRITICAL)
 
-    print(timeit.timeit(main, number=number_of_runs))
+    results = timeit.repeat(main, number=1, repeat=number_of_runs)
+    print("best: {:f} runs: {}".format(min(results), ", ".join("{:f}".format(r) for r in results)))
@@ -14,41 +14,45 @@ def compare(frame_index, parser, frame, csv_frame, show_all_fields):
     reader = parser.reader
     stats = []
     mismatched_num = 0
-    intra_inter_len = len(reader.field_defs[FrameType.INTER])
+    # hoist the per-type definition lists out of the per-field loop
+    field_defs = reader.field_defs
+    inter_defs = field_defs[FrameType.INTER]
+    intra_inter_len = len(inter_defs)
+    slow_defs = field_defs.get(FrameType.SLOW)
+    slow_len = len(slow_defs) if slow_defs is not None else 0
+    gps_defs = field_defs.get(FrameType.GPS)
+    gps_len = len(gps_defs) if gps_defs is not None else 0
 
     for i, value in enumerate(frame.data):
-        csv_value = _trycast(csv_frame[i])
+        csv_value = csv_frame[i]
 
         fdef = None
         if i < intra_inter_len:
-            fdef = reader.field_defs[FrameType.INTER][i]
+            fdef = inter_defs[i]
         else:
             cur_max_len = intra_inter_len
-            if FrameType.SLOW in reader.field_defs:
-                slowLen = len(reader.field_defs[FrameType.SLOW])
-                if i < (cur_max_len + slowLen):
-                    fdef = reader.field_defs[FrameType.SLOW][i - cur_max_len]
+            if slow_defs is not None:
+                if i < (cur_max_len + slow_len):
+                    fdef = slow_defs[i - cur_max_len]
                 else:
-                    cur_max_len += slowLen
+                    cur_max_len += slow_len
 
-            if fdef is None and FrameType.GPS in reader.field_defs:
-                gps_len = len(reader.field_defs[FrameType.GPS])
+            if fdef is None and gps_defs is not None:
                 # time is never actually written out, skip over it
                 if i < (cur_max_len + gps_len - 1):
-                    fdef = reader.field_defs[FrameType.GPS][i+1 - cur_max_len]
+                    fdef = gps_defs[i+1 - cur_max_len]
                 else:
                     raise IndexError(f"Somehow index {i} is higher than the number of field definitions")
 
         if csv_value == value:
             if show_all_fields:
-                stats.append("  field #{:d} '{:s}' value: {} encoding: {:d} predictor: {:d}".format(
-                    i, fdef.name, str(csv_value), fdef.encoding, fdef.predictor
-                ))
+                # f-strings are compiled once instead of parsing the format spec per call
+                stats.append(
+                    f"  field #{i:d} '{fdef.name:s}' value: {csv_value} encoding: {fdef.encoding:d} predictor: {fdef.predictor:d}")
             continue
         mismatched_num += 1
-        stats.append("  [!] field #{:d} '{:s}' value: {} != [{}] encoding: {:d} predictor: {:d}".format(
-            i, fdef.name, str(csv_value), str(value), fdef.encoding, fdef.predictor
-        ))
+        stats.append(
+            f"  [!] field #{i:d} '{fdef.name:s}' value: {csv_value} != [{value}] encoding: {fdef.encoding:d} predictor: {fdef.predictor:d}")
     if 0 < mismatched_num:
         print("Frame {} #{:d} ends at 0x{:X}".format(frame.type.value, frame_index + 1, parser.reader.tell()))
         print("\n".join(stats))
@@ -57,12 +61,14 @@ def compare(frame_index, parser, frame, csv_frame, show_all_fields):
 
 def main(path: str, csv_path: str, show_all_fields: bool, log_index: int):
     parser = Parser.load(path, log_index=log_index, allow_invalid_header=True)
-    csv_frames = []
-    for i, row in enumerate(csv.reader(open(csv_path))):
-        if len(row) == 2:
-            # skip log headers
-            continue
-        csv_frames.append(row)
+    # slurp the file once and tokenize in memory instead of per-line buffered
+    # reads through the open file (also closes the handle, unlike before)
+    with open(csv_path, newline='') as f:
+        content = f.read()
+    # rows of length 2 are log headers; cast the cells once here instead of
+    # once per compared frame
+    csv_frames = [[_trycast(cell) for cell in row]
+                  for row in csv.reader(content.splitlines()) if len(row) != 2]
     for i, frame in enumerate(parser.frames()):
         try:
             # add i + 1 to skip field headers in CSV